@@ -8,19 +8,19 @@ Original file is located at
 """
 
 import streamlit as st
-import pandas as pd
 from datetime import datetime
-import os
+import csv
 
-CSV_FILE = "smart_swachh_reports.csv"
+# Kept separate from the classifier app's reports, which use a different schema
+CSV_FILE = "smart_swachh_collection_requests.csv"
 
-# Save report to CSV safely
+# Append report to CSV safely
 def save_report(report):
-    df = pd.DataFrame([report])
-    if os.path.exists(CSV_FILE):
-        df_existing = pd.read_csv(CSV_FILE)
-        df = pd.concat([df_existing, df], ignore_index=True)
-    df.to_csv(CSV_FILE, index=False)
+    with open(CSV_FILE, "a", newline="", buffering=1 << 16) as f:
+        writer = csv.DictWriter(f, fieldnames=list(report.keys()))
+        if f.tell() == 0:
+            writer.writeheader()
+        writer.writerow(report)
 
 st.title("♻️ Smart Swachh – Citizen Waste Reporting Portal")
 
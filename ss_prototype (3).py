@@ -8,32 +8,62 @@ Classifies uploaded waste images into categories and subcategories using Euri AI
 # IMPORTS
 # =========================
 import streamlit as st
-import pandas as pd
 from datetime import datetime
 import base64
+import contextlib
+import hashlib
+import importlib
 import os
-import json
+import threading
+import uuid
+from collections import OrderedDict
+import orjson
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
 
 # --- Auto-detect correct Euri AI import path ---
-try:
-    from euriai.langchain import create_chat_model
-except ImportError:
+_import_error = None
+for _module_path in ("euriai.langchain", "euri.langchain", "euriai.client"):
     try:
-        from euri.langchain import create_chat_model
-    except ImportError:
-        try:
-            from euriai.client import create_chat_model
-        except ImportError as e:
-            raise ImportError(
-                "❌ Euri AI SDK not found. Please install it using:\n"
-                "   pip install euriai\n\n"
-                "If you're running inside Euron platform, ensure the 'euriai' module is available.") from e
+        create_chat_model = importlib.import_module(_module_path).create_chat_model
+        break
+    # AttributeError matches `from ... import create_chat_model`, which raises
+    # ImportError when the module exists but lacks the name
+    except (ImportError, AttributeError) as e:
+        _import_error = e
+else:
+    raise ImportError(
+        "❌ Euri AI SDK not found. Please install it using:\n"
+        "   pip install euriai\n\n"
+        "If you're running inside Euron platform, ensure the 'euriai' module is available.") from _import_error
+del _module_path, _import_error
 
 
 # =========================
 # CONFIGURATION
 # =========================
-CSV_FILE = "smart_swachh_reports.csv"
+# Each submitted report is written as its own Parquet file in this directory
+REPORTS_DIR = "smart_swachh_reports"
+
+# Reports saved before the switch to Parquet; imported once into REPORTS_DIR
+LEGACY_CSV_FILE = "smart_swachh_reports.csv"
+
+# Fixed schema for report files, so every file reads back with the same types
+REPORT_SCHEMA = pa.schema([
+    ("Reporter", pa.string()),
+    ("Location", pa.string()),
+    ("DateTime", pa.string()),
+    ("Category", pa.string()),
+    ("Subcategory", pa.string()),
+    ("Description", pa.string())
+])
+
+# Euri chat model used for classification
+EURI_MODEL = "gpt-4.1-nano"
+
+# Maximum number of image classifications kept in memory
+CLASSIFICATION_CACHE_SIZE = 512
 
 # Define all waste categories and subcategories
 CATEGORIES = {
@@ -49,82 +79,295 @@ CATEGORIES = {
     "Other": ["General", "Mixed", "Uncategorized"]
 }
 
+# Static selectbox options, built once at import
+_CATEGORY_OPTIONS = ("",) + tuple(CATEGORIES.keys())
+_SUBCATEGORY_OPTIONS = ("",)
+
+# Static prompt pieces, built once at import
+_CATEGORY_LIST_STR = "\n".join(
+    f"- {cat}: {', '.join(subs)}" for cat, subs in CATEGORIES.items()
+)
+
+_PROMPT_TEMPLATE = f"""
+You are a waste classification AI.
+Analyze the attached image (in base64 format below) and determine the best-matching
+category and subcategory from the list below.
+
+Categories and Subcategories:
+{_CATEGORY_LIST_STR}
+
+Respond strictly in JSON format:
+{{{{
+    "category": "Category Name",
+    "subcategory": "Subcategory Name"
+}}}}
+
+Base64 image (truncated): {{image_base64}}...
+"""
+
+_BATCH_PROMPT_TEMPLATE = f"""
+You are a waste classification AI.
+Analyze each of the {{count}} attached images (in base64 format below) and determine the
+best-matching category and subcategory for each from the list below.
+
+Categories and Subcategories:
+{_CATEGORY_LIST_STR}
+
+Respond strictly as a JSON array with one object per image, in the same order:
+[
+    {{{{"category": "Category Name", "subcategory": "Subcategory Name"}}}}
+]
+
+Base64 images (truncated):
+{{images}}
+"""
+
 
 # =========================
 # HELPER FUNCTIONS
 # =========================
+@st.cache_resource(show_spinner=False)
+def get_chat_model(api_key, model=EURI_MODEL):
+    """Return a Euri chat model for this API key and model, reused across reruns."""
+    return create_chat_model(
+        api_key=api_key,
+        model=model,
+        temperature=0.2
+    )
+
+
+def _write_report_table(table):
+    """Write a table of reports as a new Parquet file in the reports directory."""
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    filename = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{uuid.uuid4().hex}.parquet"
+    # Write under a "_" prefix, which the reader skips, then rename into place
+    tmp_path = os.path.join(REPORTS_DIR, "_" + filename)
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, os.path.join(REPORTS_DIR, filename))
+
+
 def save_report(data):
-    """Append a single report row to CSV file."""
-    df_new = pd.DataFrame([data])
-    if not os.path.exists(CSV_FILE):
-        df_new.to_csv(CSV_FILE, index=False)
-    else:
-        df_existing = pd.read_csv(CSV_FILE)
-        df_combined = pd.concat([df_existing, df_new], ignore_index=True)
-        df_combined.to_csv(CSV_FILE, index=False)
+    """Write a single report row as a new Parquet file in the reports directory."""
+    _write_report_table(pa.Table.from_pylist([data], schema=REPORT_SCHEMA))
 
 
-def classify_image_with_euri(image_file, api_key):
+@st.cache_resource(show_spinner=False)
+def migrate_legacy_reports():
     """
-    Classify uploaded image into category/subcategory using Euri AI.
-    Returns (category, subcategory, error_message)
+    Import reports from the legacy CSV file into the reports directory, once.
+    Returns an error message, or None when there was nothing to do or it succeeded.
     """
+    # Claim the file by renaming it, so only one session imports it
+    claimed = LEGACY_CSV_FILE + ".migrating"
     try:
-        # Convert image to base64
-        image_file.seek(0)
-        image_base64 = base64.b64encode(image_file.read()).decode("utf-8")
-        image_file.seek(0)
-
-        # Initialize Euri chat model
-        chat_model = create_chat_model(
-            api_key=api_key,
-            model="gpt-4.1-nano",
-            temperature=0.2
-        )
+        os.replace(LEGACY_CSV_FILE, claimed)
+    except FileNotFoundError:
+        return None
 
-        # Create category/subcategory list
-        category_list = "\n".join(
-            [f"- {cat}: {', '.join(subs)}" for cat, subs in CATEGORIES.items()]
+    try:
+        legacy = pacsv.read_csv(
+            claimed,
+            # Skip rows whose field count does not match the header
+            parse_options=pacsv.ParseOptions(invalid_row_handler=lambda row: "skip"),
+            convert_options=pacsv.ConvertOptions(
+                column_types={name: pa.string() for name in REPORT_SCHEMA.names}
+            )
         )
+        if "Reporter" not in legacy.column_names:
+            # Not a classifier report file (e.g. collection requests); leave it alone
+            os.replace(claimed, LEGACY_CSV_FILE)
+            return None
+
+        # Fill any report columns the legacy file lacks with nulls
+        table = pa.table(
+            [
+                legacy[name] if name in legacy.column_names else pa.nulls(legacy.num_rows, pa.string())
+                for name in REPORT_SCHEMA.names
+            ],
+            schema=REPORT_SCHEMA
+        )
+        if table.num_rows:
+            _write_report_table(table)
+        os.replace(claimed, LEGACY_CSV_FILE + ".migrated")
+        return None
+
+    except Exception as e:
+        os.replace(claimed, LEGACY_CSV_FILE)
+        return str(e)
+
+
+def list_report_files(path):
+    """Return the sorted names of the completed report files in `path`."""
+    return tuple(sorted(
+        name for name in os.listdir(path)
+        if name.endswith(".parquet") and not name.startswith("_")
+    ))
 
-        # Build prompt
-        prompt = f"""
-        You are a waste classification AI.
-        Analyze the attached image (in base64 format below) and determine the best-matching
-        category and subcategory from the list below.
-
-        Categories and Subcategories:
-        {category_list}
-
-        Respond strictly in JSON format:
-        {{
-            "category": "Category Name",
-            "subcategory": "Subcategory Name"
-        }}
-
-        Base64 image (truncated): {image_base64[:200]}...
-        """
-
-        # Get AI response
-        response = chat_model.invoke(prompt)
-        result_text = response.content.strip()
-
-        # Clean up Markdown-style output if present
-        if result_text.startswith("```"):
-            result_text = result_text.split("```")[1]
-            if result_text.strip().startswith("json"):
-                result_text = result_text[4:].strip()
-
-        # Parse JSON safely
-        result_json = json.loads(result_text)
-        category = result_json.get("category", "Other")
-        subcategory = result_json.get("subcategory", "General")
+
+@st.cache_data(max_entries=1, show_spinner=False)
+def load_reports(path, files):
+    """Load the given report files; `files` keys the cache so new reports invalidate it."""
+    import pandas as pd  # only needed for display, so keep it off the cold-start path
+
+    if files:
+        table = pq.read_table([os.path.join(path, name) for name in files], schema=REPORT_SCHEMA)
+    else:
+        table = REPORT_SCHEMA.empty_table()
+    df = table.to_pandas(types_mapper=pd.ArrowDtype)
+    for col in ("Category", "Subcategory", "Location"):
+        df[col] = df[col].astype("category")
+    return df
+
+
+def stream_until(chat_model, prompt, closing):
+    """Stream a model response, cutting it off just after the first `closing` character."""
+    parts = []
+    with contextlib.closing(chat_model.stream(prompt)) as stream:
+        for chunk in stream:
+            end = chunk.content.find(closing)
+            if end != -1:
+                parts.append(chunk.content[:end + 1])
+                break
+            parts.append(chunk.content)
+    return "".join(parts)
+
+
+def _image_prefix_base64(image_file):
+    """Return the base64 of the image header (only 200 chars go into the prompt)."""
+    image_file.seek(0)
+    head = image_file.read(150)
+    return base64.b64encode(head).decode("ascii")
+
+
+def parse_json_response(result_text):
+    """Parse a model response as JSON, stripping Markdown code fences if present."""
+    result_text = result_text.strip()
+    if result_text.startswith("```"):
+        result_text = result_text[3:]
+        if result_text.startswith("json"):
+            result_text = result_text[4:]
+        end = result_text.rfind("```")
+        if end != -1:
+            result_text = result_text[:end]
+        result_text = result_text.strip()
+    return orjson.loads(result_text)
+
+
+@st.cache_resource(show_spinner=False)
+def get_classification_cache():
+    """Return the shared (image SHA-256, model) -> (category, subcategory) cache and its lock."""
+    return OrderedDict(), threading.Lock()
+
+
+def _classification_key(image_file, model):
+    """Fingerprint an uploaded image so repeat uploads skip the API call."""
+    return hashlib.sha256(image_file.getbuffer()).digest(), model
+
+
+def _cached_classification(key):
+    """Return the cached (category, subcategory) for `key`, or None on a miss."""
+    cache, lock = get_classification_cache()
+    with lock:
+        if key not in cache:
+            return None
+        cache.move_to_end(key)
+        return cache[key]
+
+
+def _store_classification(key, result):
+    """Cache a (category, subcategory) result, evicting the least recently used entry."""
+    cache, lock = get_classification_cache()
+    with lock:
+        cache[key] = result
+        cache.move_to_end(key)
+        if len(cache) > CLASSIFICATION_CACHE_SIZE:
+            cache.popitem(last=False)
+
+
+def classify_image_with_euri(image_file, api_key, model=EURI_MODEL):
+    """
+    Classify uploaded image into category/subcategory using Euri AI.
+    Returns (category, subcategory, error_message)
+    """
+    try:
+        key = _classification_key(image_file, model)
+        result = _cached_classification(key)
+        if result is None:
+            # Convert image header to base64
+            image_base64 = _image_prefix_base64(image_file)
+
+            # Get cached Euri chat model
+            chat_model = get_chat_model(api_key, model)
+
+            # Build prompt
+            prompt = _PROMPT_TEMPLATE.format(image_base64=image_base64[:200])
+
+            # Get AI response, stopping once the JSON object closes
+            result_text = stream_until(chat_model, prompt, "}")
+
+            # Parse JSON safely
+            result_json = parse_json_response(result_text)
+            result = (
+                result_json.get("category", "Other"),
+                result_json.get("subcategory", "General")
+            )
+            _store_classification(key, result)
+
+        category, subcategory = result
         return category, subcategory, None
 
     except Exception as e:
         return None, None, str(e)
 
 
+def classify_images_with_euri(image_files, api_key, model=EURI_MODEL):
+    """
+    Classify several uploaded images in a single Euri AI request.
+    Images already in the classification cache are not sent again, and identical
+    images in the batch are sent only once.
+    Returns (list of (category, subcategory), error_message)
+    """
+    try:
+        keys = [_classification_key(image_file, model) for image_file in image_files]
+        results = [_cached_classification(key) for key in keys]
+        # Group uncached images by fingerprint, so duplicates share one request slot
+        misses = {}
+        for i, result in enumerate(results):
+            if result is None:
+                misses.setdefault(keys[i], []).append(i)
+
+        if misses:
+            # Convert each distinct uncached image header to base64
+            image_lines = []
+            for n, indices in enumerate(misses.values(), start=1):
+                image_base64 = _image_prefix_base64(image_files[indices[0]])
+                image_lines.append(f"Image {n}: {image_base64[:200]}...")
+
+            # Build one prompt covering all uncached images
+            prompt = _BATCH_PROMPT_TEMPLATE.format(
+                count=len(misses),
+                images="\n".join(image_lines)
+            )
+
+            # Get AI response, stopping once the JSON array closes
+            result_text = stream_until(get_chat_model(api_key, model), prompt, "]")
+
+            # Parse JSON array safely
+            result_json = parse_json_response(result_text)
+            if not isinstance(result_json, list) or len(result_json) != len(misses):
+                raise ValueError(f"Expected {len(misses)} classifications in the response.")
+            for (key, indices), item in zip(misses.items(), result_json):
+                result = (item.get("category", "Other"), item.get("subcategory", "General"))
+                _store_classification(key, result)
+                for i in indices:
+                    results[i] = result
+
+        return results, None
+
+    except Exception as e:
+        return None, str(e)
+
+
 # =========================
 # STREAMLIT UI
 # =========================
@@ -151,8 +394,8 @@ with st.form("waste_form", clear_on_submit=True):
         uploaded_photo = st.file_uploader("Upload Waste Image *", type=["jpg", "jpeg", "png"])
         auto_classify = st.checkbox("Auto-classify using Euri AI")
 
-        category = st.selectbox("Waste Category", [""] + list(CATEGORIES.keys()))
-        subcategory = st.selectbox("Subcategory", [""])
+        category = st.selectbox("Waste Category", _CATEGORY_OPTIONS)
+        subcategory = st.selectbox("Subcategory", _SUBCATEGORY_OPTIONS)
 
     # Auto classification section
     if auto_classify and uploaded_photo is not None:
@@ -188,15 +431,91 @@ with st.form("waste_form", clear_on_submit=True):
                 "Description": description
             }
             save_report(report_data)
-            st.success("✅ Report submitted successfully and saved to CSV!")
+            st.success("✅ Report submitted successfully!")
+
+
+# =========================
+# BATCH CLASSIFICATION
+# =========================
+st.subheader("🗂️ Batch Classification")
+pending = st.session_state.setdefault("pending_classifications", [])
+batch_results = st.session_state.setdefault("batch_results", [])
+st.session_state.setdefault("batch_uploader_key", 0)
+
+batch_photos = st.file_uploader(
+    "Upload waste images to classify together",
+    type=["jpg", "jpeg", "png"],
+    accept_multiple_files=True,
+    key=f"batch_photos_{st.session_state['batch_uploader_key']}"
+)
+if st.button("➕ Add to pending") and batch_photos:
+    queued = {record["file"].file_id for record in pending}
+    pending.extend(
+        {"Image": photo.name, "file": photo}
+        for photo in batch_photos
+        if photo.file_id not in queued
+    )
+    # Reset the uploader so the same files cannot be queued twice
+    st.session_state["batch_uploader_key"] += 1
+    st.rerun()
+
+if pending:
+    st.caption(f"{len(pending)} image(s) pending classification.")
+    if st.button("🚀 Classify all pending"):
+        if not api_key:
+            st.warning("Please enter your Euri API key in the sidebar to enable classification.")
+        else:
+            with st.spinner("Classifying pending images with Euri AI..."):
+                results, error = classify_images_with_euri([r["file"] for r in pending], api_key)
+            if error:
+                st.error(f"❌ Batch classification failed: {error}")
+            else:
+                for record, (category, subcategory) in zip(pending, results):
+                    record["Category"] = category
+                    record["Subcategory"] = subcategory
+                batch_results.extend(
+                    {k: v for k, v in record.items() if k != "file"} for record in pending
+                )
+                pending.clear()
+                st.success(f"✅ Classified {len(results)} image(s)")
+
+if batch_results:
+    st.dataframe(batch_results, use_container_width=True)
+
+    batch_reporter = st.text_input("Reporter Name *", key="batch_reporter")
+    batch_location = st.text_input("Location (City/Area) *", key="batch_location")
+    if st.button("📤 Submit classified images as reports"):
+        if not (batch_reporter and batch_location):
+            st.error("Please enter the reporter name and location for these reports.")
+        else:
+            batch_date_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            for result in batch_results:
+                save_report({
+                    "Reporter": batch_reporter,
+                    "Location": batch_location,
+                    "DateTime": batch_date_time,
+                    "Category": result["Category"],
+                    "Subcategory": result["Subcategory"],
+                    "Description": f"Batch image: {result['Image']}"
+                })
+            st.success(f"✅ Submitted {len(batch_results)} report(s) successfully!")
+            batch_results.clear()
 
 
 # =========================
 # DISPLAY SUBMITTED DATA
 # =========================
 st.subheader("📊 Submitted Reports")
-if os.path.exists(CSV_FILE):
-    df = pd.read_csv(CSV_FILE)
-    st.dataframe(df, use_container_width=True)
-else:
+migration_error = migrate_legacy_reports()
+if migration_error:
+    st.warning(f"⚠️ Could not import reports from {LEGACY_CSV_FILE}: {migration_error}")
+
+try:
+    df = load_reports(REPORTS_DIR, list_report_files(REPORTS_DIR))
+except FileNotFoundError:
+    df = None
+
+if df is None or df.empty:
     st.info("No reports submitted yet.")
+else:
+    st.dataframe(df, use_container_width=True)